@@ -2,41 +2,65 @@ import configparser
 import pymongo
 from montydb import MontyClient
 from pymongo.collection import Collection
+from typing import Tuple
 
 
 class MongoConnector(object):
     CONFIG_SECTION = "mongofs"
     DEFAULT_COLLECTION_NAME = "mongofs-drive"
+    BLOBS_SUBCOLLECTION_NAME = "blobs"
+
+    DEFAULT_COMPRESSORS = "zlib"
+    ZLIB_COMPRESSION_LEVEL = 3
+    DEFAULT_WRITE_CONCERN = "1"
+    MAX_POOL_SIZE = 64
 
     def __init__(self, config: configparser.ConfigParser) -> None:
         self.config = config
 
-    def connect(self) -> Collection:
+    # Returns the inodes collection (paths and metadata) and the blobs collection (file contents)
+    def connect(self) -> Tuple[Collection, Collection]:
         mongo_backend = self.config.get(section=self.CONFIG_SECTION, option="backend")
         if hasattr(self, f"_MongoConnector__connect_{mongo_backend}"):
             return getattr(self, f"_MongoConnector__connect_{mongo_backend}")()
         raise ValueError(f'Unrecognized backend "{mongo_backend}"')
 
-    def __connect_memory_instance(self) -> Collection:
+    def __connect_memory_instance(self) -> Tuple[Collection, Collection]:
         database = self.config.get(section=self.CONFIG_SECTION, option="database")
         collection_name = self.config.get(section=self.CONFIG_SECTION, option="collection")
-        return MontyClient(":memory:")[database][collection_name]
+        col = MontyClient(":memory:")[database][collection_name]
+        return col, col[self.BLOBS_SUBCOLLECTION_NAME]
 
-    def __connect_mongo_server(self) -> Collection:
+    def __connect_mongo_server(self) -> Tuple[Collection, Collection]:
         username = self.config.get(section=self.CONFIG_SECTION, option="username")
         password = self.config.get(section=self.CONFIG_SECTION, option="password")
         host = self.config.get(section=self.CONFIG_SECTION, option="host")
         database = self.config.get(section=self.CONFIG_SECTION, option="database")
         collection_name = self.config.get(section=self.CONFIG_SECTION, option="collection")
-        connection_string = \
-            f"mongodb+srv://{username}:{password}@{host}/{database}?retryWrites=true&w=majority"
+        compressors = self.config.get(section=self.CONFIG_SECTION, option="compressors",
+                                      fallback=self.DEFAULT_COMPRESSORS)
+        write_concern = self.config.get(section=self.CONFIG_SECTION, option="write_concern",
+                                        fallback=self.DEFAULT_WRITE_CONCERN)
+        connection_string = f"mongodb+srv://{username}:{password}@{host}/{database}"
+
+        w = int(write_concern) if write_concern.isdigit() else write_concern
+        client_options = {}
+        if w != "majority":
+            # The acknowledgement of the members is enough, majority writes keep the server journaling default
+            client_options["journal"] = False
 
-        client = pymongo.MongoClient(connection_string)
+        # A single client (and its connection pool) is kept for the whole life of the mount
+        client = pymongo.MongoClient(connection_string,
+                                     compressors=compressors, zlibCompressionLevel=self.ZLIB_COMPRESSION_LEVEL,
+                                     w=w, maxPoolSize=self.MAX_POOL_SIZE, retryWrites=True, **client_options)
         db = client[database]
         col = db[collection_name]
         col.create_index([("path", pymongo.ASCENDING)], unique=True)
+        col.create_index([("path", pymongo.ASCENDING), ("type", pymongo.ASCENDING)])
         col.create_index([("path", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)])
         col.create_index([("path", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING)])
         col.create_index([("path", pymongo.ASCENDING), ("last_updated_at", pymongo.ASCENDING)])
         col.create_index([("path", pymongo.ASCENDING), ("last_updated_at", pymongo.DESCENDING)])
-        return col
+        blobs_col = col[self.BLOBS_SUBCOLLECTION_NAME]
+        blobs_col.create_index([("inode_id", pymongo.ASCENDING), ("chunk_idx", pymongo.ASCENDING)], unique=True)
+        return col, blobs_col
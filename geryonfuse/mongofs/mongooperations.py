@@ -1,20 +1,23 @@
+import cachetools
 import collections
 import configparser
 import datetime
 import errno
 import fuse
-import io
-import math
 import pymongo
-import re
 import stat
 import time
-from typing import Dict, Any
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from typing import Dict, Any, Iterator, List, Tuple
 from geryonfuse.logger.geryon_logger import build_logger
 from geryonfuse.mongofs.mongo_connector import MongoConnector
 
 READDIR_RESULT_ITEM = collections.namedtuple("READDIR_RESULT_ITEM", ["filename", "attrs", "offset"])
 
+# Fields needed to build a stat result
+STAT_PROJECTION = {"type": 1, "size": 1, "last_updated_at": 1}
+
 
 class MongoOperations(fuse.Operations):
     CONFIG_SECTION = "mongofs"
@@ -24,6 +27,14 @@ class MongoOperations(fuse.Operations):
     SUCCESS_EXIT_CODE = 0
     ERROR_EXIT_CODE = 1
 
+    CHUNK_SIZE = 256 * 1024  # 256 KB
+
+    DIR_MODE = stat.S_IFDIR | 0o777
+    FILE_MODE = stat.S_IFREG | 0o666
+
+    DEFAULT_STAT_CACHE_SIZE = 100_000
+    DEFAULT_STAT_CACHE_TTL = 60  # seconds
+
     def __new__(cls, config: configparser.ConfigParser):
         cls.__config = config
         cls.__logger = build_logger(config=cls.__config)
@@ -31,9 +42,12 @@ class MongoOperations(fuse.Operations):
 
     def __init__(self, config: configparser.ConfigParser) -> None:
         mongo_connector = MongoConnector(config=config)
-        self.col = mongo_connector.connect()
-        if not self.col.find_one({"path": "/"}):
-            self.create_root()
+        self.inodes, self.blobs = mongo_connector.connect()
+        self.__stat_cache = cachetools.TTLCache(
+            maxsize=config.getint(self.CONFIG_SECTION, "stat_cache_size", fallback=self.DEFAULT_STAT_CACHE_SIZE),
+            ttl=config.getfloat(self.CONFIG_SECTION, "stat_cache_ttl", fallback=self.DEFAULT_STAT_CACHE_TTL)
+        )
+        self.create_root()
 
     @classmethod
     def __parent_path(cls, path: str) -> str:
@@ -43,62 +57,157 @@ class MongoOperations(fuse.Operations):
         return path[:last_slash_pos]
 
     @classmethod
-    def __build_doc(cls, path: str, doc_type: str, content: bytes = None) -> Dict[str, Any]:
-        now = datetime.datetime.utcnow()
+    def __children_prefix(cls, path: str) -> str:
+        if path == "/":
+            return "/"
+        return f"{path}/"
+
+    @classmethod
+    def __descendants_range(cls, path: str) -> Dict[str, str]:
+        # "0" is the character right after "/", so [prefix, prefix[:-1] + "0") holds exactly
+        # the paths that start with prefix
+        prefix = cls.__children_prefix(path=path)
+        return {"$gt": prefix, "$lt": f"{prefix[:-1]}0"}
+
+    @classmethod
+    def __subtree_query(cls, path: str) -> Dict[str, Any]:
+        # Matches the path and all its descendants, so a subtree can be changed with a single command
+        return {"$or": [{"path": path}, {"path": cls.__descendants_range(path=path)}]}
+
+    @classmethod
+    def __build_doc(cls, path: str, doc_type: str, size: int = None) -> Dict[str, Any]:
+        now = cls.__now()
         doc = {"path": path, "type": doc_type, "created_at": now, "last_updated_at": now}
-        if content is not None:
-            doc["content"] = content
-            doc["size"] = len(content)
+        if size is not None:
+            doc["size"] = size
         return doc
 
-    def __create_doc(self, path: str, doc_type: str, content: bytes = None) -> Dict[str, Any]:
-        doc = self.__build_doc(path=path, doc_type=doc_type, content=content)
-        self.col.insert_one(doc)
+    def __create_doc(self, path: str, doc_type: str, size: int = None) -> Dict[str, Any]:
+        doc = self.__build_doc(path=path, doc_type=doc_type, size=size)
+        # MontyDB has no unique indexes, so existing paths have to be looked for
+        if not isinstance(self.inodes, Collection) and \
+                self.inodes.find_one({"path": path}, projection={"_id": 0, "path": 1}) is not None:
+            raise fuse.FuseOSError(errno.EEXIST)
+        try:
+            # The unique path index rejects existing paths, so there is no need to look for them first
+            self.inodes.insert_one(doc)
+        except DuplicateKeyError:
+            raise fuse.FuseOSError(errno.EEXIST)
         return doc
 
     @classmethod
-    def __now(cls) -> datetime.datetime:
-        return datetime.datetime.utcnow()
+    def __now(cls) -> float:
+        # Timestamps are stored as epoch seconds, so they can be used as stat times without any conversion
+        return time.time()
+
+    def __invalidate_stats(self, *paths: str) -> None:
+        for path in paths:
+            self.__stat_cache.pop(path, None)
+
+    def __invalidate_subtree_stats(self, path: str) -> None:
+        prefix = self.__children_prefix(path=path)
+        self.__invalidate_stats(path, *[cached_path for cached_path in self.__stat_cache
+                                        if cached_path.startswith(prefix)])
+
+    def __is_dir(self, path: str) -> bool:
+        # Only indexed fields are returned, so the (path, type) index covers the query
+        return self.inodes.find_one({"path": path, "type": "dir"}, projection={"_id": 0, "path": 1}) is not None
+
+    def __find_file(self, path: str) -> Dict[str, Any]:
+        # content is only present in files written before contents were moved to the blobs collection
+        file_doc = self.inodes.find_one({"path": path, "type": "file"}, projection={"size": 1, "content": 1})
+        if file_doc is None:
+            raise fuse.FuseOSError(errno.EIO)
+        if "content" in file_doc:
+            self.__migrate_inline_content(path=path, file_doc=file_doc)
+        return file_doc
+
+    def __migrate_inline_content(self, path: str, file_doc: Dict[str, Any]) -> None:
+        content = file_doc.pop("content")
+        chunk_upserts = [({"inode_id": file_doc["_id"], "chunk_idx": chunk_idx},
+                          {"$set": {"data": content[chunk_start:chunk_start + self.CHUNK_SIZE]}})
+                         for chunk_idx, chunk_start in enumerate(range(0, len(content), self.CHUNK_SIZE))]
+        self.__upsert_many(col=self.blobs, upserts=chunk_upserts)
+        self.inodes.update_one({"_id": file_doc["_id"]}, {"$set": {"size": len(content)}, "$unset": {"content": ""}})
+        file_doc["size"] = len(content)
+        # the stored size could be stale, so the cached stat of this file must not be served anymore
+        self.__invalidate_stats(path)
+
+    def __find_chunks(self, inode_id: Any, chunk_idx_query: Dict[str, Any]) -> Dict[int, bytes]:
+        chunk_docs = self.blobs.find({"inode_id": inode_id, "chunk_idx": chunk_idx_query},
+                                     projection={"_id": 0, "chunk_idx": 1, "data": 1})
+        return {chunk_doc["chunk_idx"]: chunk_doc["data"] for chunk_doc in chunk_docs}
 
-    def __create_file(self, path: str, content: bytes = b"") -> Dict[str, Any]:
-        return self.__create_doc(path=path, doc_type="file", content=content)
+    @classmethod
+    def __chunk_spans(cls, offset: int, end: int) -> Iterator[Tuple[int, int, int]]:
+        # Yields the index of every chunk overlapping [offset, end) with the overlapping bounds inside the chunk
+        for chunk_idx in range(offset // cls.CHUNK_SIZE, (end - 1) // cls.CHUNK_SIZE + 1):
+            chunk_start = chunk_idx * cls.CHUNK_SIZE
+            yield chunk_idx, max(offset, chunk_start) - chunk_start, min(end, chunk_start + cls.CHUNK_SIZE) - chunk_start
 
-    def __create_dir(self, path: str) -> Dict[str, Any]:
-        return self.__create_doc(path=path, doc_type="dir")
+    @classmethod
+    def __keeps_chunk_data(cls, chunk_idx: int, write_start: int, write_end: int, size: int) -> bool:
+        # Whether a file of the given size has data in the chunk outside of the [write_start, write_end) span
+        chunk_start = chunk_idx * cls.CHUNK_SIZE
+        return (0 < write_start and chunk_start < size) or (write_end < cls.CHUNK_SIZE and chunk_start + write_end < size)
 
-    def __build_stat_from_doc(self, doc):
-        (uid, gid, pid) = fuse.fuse_get_context()
+    @classmethod
+    def __upsert_many(cls, col: Collection, upserts: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        if not upserts:
+            return
+        if isinstance(col, Collection):
+            col.bulk_write([pymongo.UpdateOne(query, update, upsert=True) for query, update in upserts],
+                           ordered=False)
+        else:
+            # MontyDB does not implement bulk_write
+            for query, update in upserts:
+                col.update_one(query, update, upsert=True)
 
-        block_size = 1_000_000  # 1 MB
+    def __create_file(self, path: str) -> Dict[str, Any]:
+        # File metadata lives in the inodes collection and the content in the blobs one, split in chunks
+        # of CHUNK_SIZE bytes, so metadata operations never load the content and reads and writes only
+        # transfer the chunks they touch. An empty file has no chunks.
+        return self.__create_doc(path=path, doc_type="file", size=0)
 
-        if doc["type"] == "dir":
-            permission = 0o777
-        else:
-            permission = 0o666
+    def __create_dir(self, path: str) -> Dict[str, Any]:
+        return self.__create_doc(path=path, doc_type="dir")
 
-        last_updated_at_epoch = doc["last_updated_at"].timestamp()
-        stat_result = {
-            "st_mtime": last_updated_at_epoch,  # modified time.
-            "st_ctime": last_updated_at_epoch,  # changed time.
+    @classmethod
+    def __build_stat_template(cls) -> Dict[str, Any]:
+        # Fields shared by every stat result built while serving the same FUSE call
+        (uid, gid, pid) = fuse.fuse_get_context()
+        return {
             "st_atime": time.time(),
             "st_uid": uid,
             "st_gid": gid,
         }
 
+    def __build_stat_from_doc(self, doc, stat_template: Dict[str, Any] = None):
+        if stat_template is None:
+            stat_template = self.__build_stat_template()
+
+        block_size = 1_000_000  # 1 MB
+
+        stat_result = stat_template.copy()
+        last_updated_at = doc["last_updated_at"]
+        if isinstance(last_updated_at, datetime.datetime):
+            # Inodes written before timestamps were stored as epoch seconds hold naive UTC datetimes
+            last_updated_at = last_updated_at.replace(tzinfo=datetime.timezone.utc).timestamp()
+        stat_result["st_mtime"] = last_updated_at  # modified time.
+        stat_result["st_ctime"] = last_updated_at  # changed time.
+
         if doc["type"] == "dir":
             stat_result["st_size"] = 1024 * 4  # Size of a directory, 4KB per some sources?
-            stat_result["st_mode"] = (stat.S_IFDIR | permission)
+            stat_result["st_mode"] = self.DIR_MODE
             stat_result["st_nlink"] = 2  # Number of hard links to a directory, 2 because of historical reasons
         else:
-            self.__logger.debug(doc)
             stat_result["st_size"] = doc.get("size", 0)  # TODO: can size not exists?
-            stat_result["st_mode"] = (stat.S_IFREG | permission)
+            stat_result["st_mode"] = self.FILE_MODE
             stat_result["st_nlink"] = 1
-            self.__logger.debug(f"doc is ok: {doc}")
 
-        stat_result["st_blocks"] = int(math.ceil(float(stat_result["st_size"]) / block_size))
+        stat_result["st_blocks"] = (stat_result["st_size"] + block_size - 1) // block_size
 
-        self.__logger.debug(f"stat_result {stat_result}")
+        self.__logger.debug("stat_result %s", stat_result)
         return stat_result
 
     def chmod(self, path, mode):
@@ -108,32 +217,45 @@ class MongoOperations(fuse.Operations):
         return self.NOT_IMPLEMENT_EXIT_CODE
 
     def getattr(self, path, fh=None):
-        self.__logger.debug(f"getattr of {path} {fh}")
-        doc = self.col.find_one({"path": path})
-        self.__logger.debug(f"doc /: {doc}")
+        self.__logger.debug("getattr of %s %s", path, fh)
+        stat_result = self.__stat_cache.get(path)
+        if stat_result is not None:
+            return stat_result
+        doc = self.inodes.find_one({"path": path}, projection=STAT_PROJECTION)
         if doc is None:
-            self.__logger.debug(f"doc DOESN'T exist in {path} before __build_stat_from_doc")
+            self.__logger.debug("doc DOESN'T exist in %s before __build_stat_from_doc", path)
             raise fuse.FuseOSError(errno.ENOENT)
 
-        self.__logger.debug(f"doc exists in {path} before __build_stat_from_doc")
-        return self.__build_stat_from_doc(doc=doc)
+        self.__logger.debug("doc exists in %s before __build_stat_from_doc", path)
+        stat_result = self.__build_stat_from_doc(doc=doc)
+        self.__stat_cache[path] = stat_result
+        return stat_result
 
     def readdir(self, path, offset=0):
-        self.__logger.debug(f"readdir {path}")
+        self.__logger.debug("readdir %s", path)
         yield "."
         yield ".."
-        if path == "/":
-            self.__logger.debug(f"path /: {path}")
-            file_docs = self.col.find({"path": {"$regex": "^/[^/]+$"}}).sort([("path", pymongo.ASCENDING)])
-            #self.__logger.debug(f"file_docs in /: {list(file_docs)}")
-        else:
-            self.__logger.debug(f"path std: {path}")
-            file_docs = self.col.find({"path": {"$regex": f"^{path}/[^/]+$"}}).sort([("path", pymongo.ASCENDING)])
-            #self.__logger.debug(f"file_docs in {path}: {list(file_docs)}")
-
+        prefix_length = len(self.__children_prefix(path=path))
+        stat_template = self.__build_stat_template()
+        # Range query over the path index instead of a regex
+        children_query = {"path": self.__descendants_range(path=path)}
+        is_mongo_server = isinstance(self.inodes, Collection)
+        if is_mongo_server:
+            # Deeper descendants are discarded by the server, so only the children are returned
+            children_query["$expr"] = {"$not": {"$regexMatch": {
+                "input": {"$substrCP": ["$path", prefix_length, {"$strLenCP": "$path"}]}, "regex": "/"
+            }}}
+        file_docs = self.inodes.find(children_query,
+                                     projection=dict(STAT_PROJECTION, path=1)).sort([("path", pymongo.ASCENDING)])
         for file_doc in file_docs:
-            file_name = re.sub(f"^{path}/?", "", file_doc["path"])
-            self.__logger.debug(f"file_name is {file_name}")
+            file_name = file_doc["path"][prefix_length:]
+            # MontyDB does not implement $expr
+            if not is_mongo_server and "/" in file_name:
+                continue
+            # The kernel usually asks for the attributes of every entry after a readdir,
+            # so they are cached now to avoid one query per entry
+            self.__stat_cache[file_doc["path"]] = self.__build_stat_from_doc(doc=file_doc, stat_template=stat_template)
+            self.__logger.debug("file_name is %s", file_name)
             yield file_name
 
     def readlink(self, path):
@@ -143,22 +265,28 @@ class MongoOperations(fuse.Operations):
         return self.NOT_IMPLEMENT_EXIT_CODE
 
     def rmdir(self, path):
-        self.col.delete_one({"path": path})
-        self.col.delete_many({"path": {"$regex": f"{path}/*"}})
+        subtree_query = self.__subtree_query(path=path)
+        subtree_docs = list(self.inodes.find(subtree_query, projection={"path": 1, "type": 1}))
+        self.blobs.delete_many({"inode_id": {"$in": [subtree_doc["_id"] for subtree_doc in subtree_docs
+                                                     if subtree_doc["type"] == "file"]}})
+        self.inodes.delete_many(subtree_query)
+        # The removed paths are known, so there is no need to look for them in the whole stat cache
+        self.__invalidate_stats(self.__parent_path(path=path), *[subtree_doc["path"] for subtree_doc in subtree_docs])
         return self.SUCCESS_EXIT_CODE
 
     def mkdir(self, path, mode="r"):
-        self.__logger.debug(f"mkdir {path}")
+        self.__logger.debug("mkdir %s", path)
         parent_path = self.__parent_path(path=path)
-        if self.col.find_one({"path": parent_path, "type": "dir"}):
-            self.__logger.debug(f"parent path {path} exists")
+        if self.__is_dir(path=parent_path):
+            self.__logger.debug("parent path %s exists", path)
             self.__create_dir(path=path)
+            self.__invalidate_stats(path, parent_path)
             return 0
-        self.__logger.debug(f"parent path {path} does not exist")
+        self.__logger.debug("parent path %s does not exist", path)
         raise fuse.FuseOSError(errno.EIO)
 
     def statfs(self, path):
-        self.__logger.debug(f"statfs {path}")
+        self.__logger.debug("statfs %s", path)
         # TODO: check this stats
         transfer_block_size = 256
         fragment_size = 256
@@ -173,12 +301,14 @@ class MongoOperations(fuse.Operations):
         }
 
     def unlink(self, path):
-        self.__logger.debug(f"unlink {path}")
-        file_doc = self.col.find_one({"path": path})
+        self.__logger.debug("unlink %s", path)
+        file_doc = self.inodes.find_one({"path": path}, projection={"type": 1})
         if file_doc:
             if file_doc["type"] == "dir":
                 raise fuse.FuseOSError(errno.EISDIR)
-            res = self.col.delete_one({"path": path})
+            self.blobs.delete_many({"inode_id": file_doc["_id"]})
+            res = self.inodes.delete_one({"_id": file_doc["_id"]})
+            self.__invalidate_stats(path, self.__parent_path(path=path))
             return self.SUCCESS_EXIT_CODE if res else self.ERROR_EXIT_CODE
         else:
             raise fuse.FuseOSError(errno.ENOENT)
@@ -186,11 +316,49 @@ class MongoOperations(fuse.Operations):
     def symlink(self, name, target):
         return self.SUCCESS_EXIT_CODE
 
+    def __remove_rename_target(self, source_doc: Dict[str, Any], target_doc: Dict[str, Any]) -> None:
+        # An existing target is replaced, but a directory can only replace an empty directory, as in POSIX
+        if target_doc["type"] == "dir":
+            if source_doc["type"] != "dir":
+                raise fuse.FuseOSError(errno.EISDIR)
+            if self.inodes.find_one({"path": self.__descendants_range(path=target_doc["path"])},
+                                    projection={"_id": 0, "path": 1}) is not None:
+                raise fuse.FuseOSError(errno.ENOTEMPTY)
+        elif source_doc["type"] == "dir":
+            raise fuse.FuseOSError(errno.ENOTDIR)
+        else:
+            self.blobs.delete_many({"inode_id": target_doc["_id"]})
+        self.inodes.delete_one({"_id": target_doc["_id"]})
+
     def rename(self, old, new):
-        self.__logger.debug(f"rename {old} to {new}")
-        res = self.col.update_one({"path": old}, {"$set": {"path": new, "last_updated_at": self.__now()}})
-        if res is None:
+        self.__logger.debug("rename %s to %s", old, new)
+        source_doc = self.inodes.find_one({"path": old}, projection={"path": 1, "type": 1})
+        if source_doc is None:
             raise fuse.FuseOSError(errno.ENOENT)
+        if old == new:
+            return self.SUCCESS_EXIT_CODE
+        target_doc = self.inodes.find_one({"path": new}, projection={"path": 1, "type": 1})
+        if target_doc is not None:
+            self.__remove_rename_target(source_doc=source_doc, target_doc=target_doc)
+        now = self.__now()
+        subtree_query = self.__subtree_query(path=old)
+        if isinstance(self.inodes, Collection):
+            # The paths of the whole subtree are rewritten by the server in a single pipeline update
+            self.inodes.update_many(subtree_query, [{"$set": {
+                "path": {"$concat": [new, {"$substrCP": ["$path", len(old), {"$strLenCP": "$path"}]}]},
+                "last_updated_at": now
+            }}])
+        else:
+            # MontyDB does not implement pipeline updates
+            for subtree_doc in list(self.inodes.find(subtree_query, projection={"path": 1})):
+                self.inodes.update_one({"_id": subtree_doc["_id"]},
+                                       {"$set": {"path": f"{new}{subtree_doc['path'][len(old):]}",
+                                                 "last_updated_at": now}})
+        # Only a directory has descendants to invalidate, and a replaced target could only be an empty directory
+        if source_doc["type"] == "dir":
+            self.__invalidate_subtree_stats(path=old)
+        self.__invalidate_stats(old, new, self.__parent_path(path=old), self.__parent_path(path=new))
+        return self.SUCCESS_EXIT_CODE
 
     def link(self, target, name):
         return self.NOT_IMPLEMENT_EXIT_CODE
@@ -199,58 +367,82 @@ class MongoOperations(fuse.Operations):
         return self.NOT_IMPLEMENT_EXIT_CODE
 
     def open(self, path, flags=None):
-        self.__logger.debug(f"open {path}")
-        file_doc = self.col.find_one({"path": path})
-        self.__logger.debug(f"file_doc is {file_doc}")
+        self.__logger.debug("open %s", path)
+        file_doc = self.inodes.find_one({"path": path}, projection={"_id": 0, "path": 1})
         if file_doc is None:
             raise fuse.FuseOSError(errno.EACCES)
         return self.SUCCESS_EXIT_CODE
 
     def create(self, path, mode=None, fi=None):
-        self.__logger.debug(f"create {path}")
+        self.__logger.debug("create %s", path)
         parent_path = self.__parent_path(path=path)
-        if self.col.find_one({"path": parent_path, "type": "dir"}):
-            self.__logger.debug(f"parent path {path} exists")
+        if self.__is_dir(path=parent_path):
+            self.__logger.debug("parent path %s exists", path)
             self.__create_file(path=path)
+            self.__invalidate_stats(path, parent_path)
             return 0
-        self.__logger.debug(f"parent path {path} does not exist")
+        self.__logger.debug("parent path %s does not exist", path)
         raise fuse.FuseOSError(errno.EIO)
 
     def read(self, path, length, offset=0, fh=None):
-        self.__logger.debug(f"read {path}")
-        file_doc = self.col.find_one({"path": path})
-        if file_doc is None:
-            raise fuse.FuseOSError(errno.EIO)
+        self.__logger.debug("read %s", path)
+        file_doc = self.__find_file(path=path)
+        end = min(offset + length, file_doc["size"])
+        if end <= offset:
+            return b""
+        chunk_idx_query = {"$gte": offset // self.CHUNK_SIZE, "$lte": (end - 1) // self.CHUNK_SIZE}
+        chunks = self.__find_chunks(inode_id=file_doc["_id"], chunk_idx_query=chunk_idx_query)
         # TODO: decrypt content
-        file_io = io.BytesIO(file_doc["content"])
-        file_io.seek(offset)
-        return file_io.read(length)
+        # Chunks, or parts of them, that were never written (holes) are read as zeros
+        return b"".join(chunks.get(chunk_idx, b"")[read_start:read_end].ljust(read_end - read_start, b"\x00")
+                        for chunk_idx, read_start, read_end in self.__chunk_spans(offset=offset, end=end))
 
     def write(self, path, buf, offset=0, fh=None):
-        self.__logger.debug(f"write {path}")
-        now = datetime.datetime.utcnow()
-        file_doc = self.col.find_one({"path": path})
-        if file_doc is None:
-            raise fuse.FuseOSError(errno.EIO)
+        self.__logger.debug("write %s", path)
+        file_doc = self.__find_file(path=path)
+        if not buf:
+            return 0
+        end = offset + len(buf)
+        chunk_spans = list(self.__chunk_spans(offset=offset, end=end))
+        # Only the chunks keeping some of their current bytes are fetched, i.e. at most the first and the
+        # last ones. Chunks fully overwritten or beyond the end of the file are written blindly, so an append
+        # transfers O(CHUNK_SIZE + len(buf)): the partial tail chunk is fetched and upserted again whole.
+        kept_chunk_idxs = [chunk_idx for chunk_idx, write_start, write_end in chunk_spans
+                           if self.__keeps_chunk_data(chunk_idx=chunk_idx, write_start=write_start,
+                                                      write_end=write_end, size=file_doc["size"])]
+        chunks = {}
+        if kept_chunk_idxs:
+            chunks = self.__find_chunks(inode_id=file_doc["_id"], chunk_idx_query={"$in": kept_chunk_idxs})
         # TODO: decrypt content
-        file_io = io.BytesIO(file_doc["content"])
-        file_io.seek(offset)
-        file_io.write(buf)
-        file_io.seek(0)
-        # TODO: encrypt content
-        updated_content = file_io.read()
-        res = self.col.update_one(filter={"path": path},
-                                  update={"$set": {"content": updated_content, "size": len(buf),
-                                                   "last_updated_at": self.__now()}})
+        buf_view = memoryview(buf)
+        chunk_upserts = []
+        for chunk_idx, write_start, write_end in chunk_spans:
+            chunk = chunks.get(chunk_idx, b"")
+            buf_start = chunk_idx * self.CHUNK_SIZE + write_start - offset
+            chunk_data = b"".join((chunk[:write_start].ljust(write_start, b"\x00"),
+                                   buf_view[buf_start:buf_start + write_end - write_start],
+                                   chunk[write_end:]))
+            # TODO: encrypt content
+            chunk_upserts.append(({"inode_id": file_doc["_id"], "chunk_idx": chunk_idx},
+                                  {"$set": {"data": chunk_data}}))
+        self.__upsert_many(col=self.blobs, upserts=chunk_upserts)
+        res = self.inodes.update_one(filter={"_id": file_doc["_id"]},
+                                     update={"$max": {"size": end}, "$set": {"last_updated_at": self.__now()}})
+        self.__invalidate_stats(path)
         if res:
-            self.__logger.debug(f"write {path} was OK")
+            self.__logger.debug("write %s was OK", path)
             return len(buf)
         raise fuse.FuseOSError(errno.EIO)
 
     def truncate(self, path, length=None, fh=None):
-        self.__logger.debug(f"truncate {path}")
-        res = self.col.update_one({"path": path},
-                                  {"$set": {"content": b"", "size": 0, "last_updated_at": self.__now()}})
+        self.__logger.debug("truncate %s", path)
+        file_doc = self.inodes.find_one({"path": path, "type": "file"}, projection={"_id": 1})
+        if file_doc is None:
+            return self.ERROR_EXIT_CODE
+        self.blobs.delete_many({"inode_id": file_doc["_id"]})
+        res = self.inodes.update_one({"_id": file_doc["_id"]}, {"$set": {"size": 0, "last_updated_at": self.__now()},
+                                                                "$unset": {"content": ""}})
+        self.__invalidate_stats(path)
         return self.SUCCESS_EXIT_CODE if res else self.ERROR_EXIT_CODE
 
     def flush(self, path, fh):
@@ -265,8 +457,11 @@ class MongoOperations(fuse.Operations):
     # Useful method
     # TODO: move to future MongoConnection class?
     def wipe(self):
-        self.col.delete_many(filter={})
+        self.blobs.delete_many(filter={})
+        self.inodes.delete_many(filter={})
+        self.__stat_cache.clear()
         self.create_root()
 
     def create_root(self):
-        self.__create_dir(path="/")
+        # Upsert on the unique path, so the root is only created when it does not exist yet in a single command
+        self.inodes.update_one({"path": "/"}, {"$setOnInsert": self.__build_doc(path="/", doc_type="dir")}, upsert=True)
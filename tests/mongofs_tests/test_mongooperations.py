@@ -1,8 +1,15 @@
 import configparser
+import datetime
 import os
+import stat
+import time
 import unittest
 import fuse
+import pymongo
+from unittest import mock
 from geryonfuse import MongoOperations
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 
 
 class TestMongoOperations(unittest.TestCase):
@@ -14,21 +21,159 @@ class TestMongoOperations(unittest.TestCase):
         self.mongo_operations = MongoOperations(config)
         self.mongo_operations.wipe()
 
+    def test_create_root(self):
+        self.mongo_operations.create_root()
+
+        root_stat = self.mongo_operations.getattr(path="/")
+
+        self.assertEqual(1, self.mongo_operations.inodes.count_documents({"path": "/"}))
+        self.assertTrue(stat.S_ISDIR(root_stat["st_mode"]))
+
     def test_read(self):
         self.mongo_operations.create(path="/my_file")
         self.mongo_operations.write(path="/my_file", buf=b"this is the content")
         content = self.mongo_operations.read(path="/my_file", length=256)
         self.assertEqual(b"this is the content", content)
 
+    def test_read_file_with_inline_content(self):
+        # Files written at an offset by older versions stored the length of the last buffer as size
+        now = datetime.datetime.utcnow()
+        self.mongo_operations.inodes.insert_one({"path": "/old_file", "type": "file", "content": b"hello", "size": 3,
+                                                 "created_at": now, "last_updated_at": now})
+
+        stat_before_read = self.mongo_operations.getattr(path="/old_file")
+        content_before_write = self.mongo_operations.read(path="/old_file", length=256)
+        stat_after_read = self.mongo_operations.getattr(path="/old_file")
+        self.mongo_operations.write(path="/old_file", buf=b" world", offset=5)
+        content_after_write = self.mongo_operations.read(path="/old_file", length=256)
+
+        self.assertEqual(3, stat_before_read["st_size"])
+        self.assertEqual(5, stat_after_read["st_size"])
+        self.assertEqual(b"hello", content_before_write)
+        self.assertEqual(b"hello world", content_after_write)
+        self.assertIsNone(self.mongo_operations.inodes.find_one({"path": "/old_file", "content": {"$exists": True}}))
+
     def test_read_non_existent_file(self):
         with self.assertRaises(fuse.FuseOSError) as context:
             self.mongo_operations.read(path="/this/file/does/not/exists", length=256)
         self.assertEqual("[Errno 5] Input/output error", str(context.exception))
 
+    def test_getattr(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.create(path="/my/file")
+        self.mongo_operations.write(path="/my/file", buf=b"this is the content")
+
+        dir_stat = self.mongo_operations.getattr(path="/my")
+        file_stat = self.mongo_operations.getattr(path="/my/file")
+
+        self.assertTrue(stat.S_ISDIR(dir_stat["st_mode"]))
+        self.assertTrue(stat.S_ISREG(file_stat["st_mode"]))
+        self.assertEqual(19, file_stat["st_size"])
+        self.assertEqual(1, file_stat["st_blocks"])
+        self.assertAlmostEqual(time.time(), file_stat["st_mtime"], delta=60)
+
+    def test_getattr_with_datetime_timestamps(self):
+        last_updated_at = datetime.datetime.utcnow()
+        self.mongo_operations.inodes.delete_many({"path": "/"})
+        self.mongo_operations.inodes.insert_one({"path": "/", "type": "dir",
+                                                 "created_at": last_updated_at, "last_updated_at": last_updated_at})
+        self.mongo_operations.inodes.insert_one({"path": "/old_dir", "type": "dir",
+                                                 "created_at": last_updated_at, "last_updated_at": last_updated_at})
+
+        root_stat = self.mongo_operations.getattr(path="/")
+        list(self.mongo_operations.readdir(path="/"))
+        dir_stat = self.mongo_operations.getattr(path="/old_dir")
+
+        expected_mtime = last_updated_at.replace(tzinfo=datetime.timezone.utc).timestamp()
+        for stat_result in (root_stat, dir_stat):
+            self.assertIsInstance(stat_result["st_mtime"], float)
+            self.assertAlmostEqual(expected_mtime, stat_result["st_mtime"], delta=1)
+            self.assertEqual(int(expected_mtime), int(stat_result["st_ctime"]))
+
+    def test_getattr_after_write(self):
+        path = "/my_file"
+        self.mongo_operations.create(path=path)
+        size_before_write = self.mongo_operations.getattr(path=path)["st_size"]
+        self.mongo_operations.write(path=path, buf=b"this is the content")
+        size_after_write = self.mongo_operations.getattr(path=path)["st_size"]
+
+        self.assertEqual(0, size_before_write)
+        self.assertEqual(19, size_after_write)
+
+    def test_getattr_after_unlink(self):
+        path = "/my_file"
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.getattr(path=path)
+        self.mongo_operations.unlink(path=path)
+
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.getattr(path=path)
+        self.assertEqual("[Errno 2] No such file or directory", str(context.exception))
+
+    def test_getattr_after_rmdir_of_parent(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.mkdir(path="/my/path1")
+        self.mongo_operations.create(path="/my/path1/file")
+        self.mongo_operations.getattr(path="/my/path1")
+        self.mongo_operations.getattr(path="/my/path1/file")
+
+        self.mongo_operations.rmdir(path="/my")
+
+        for path in ("/my", "/my/path1", "/my/path1/file"):
+            with self.assertRaises(fuse.FuseOSError):
+                self.mongo_operations.getattr(path=path)
+
+    def test_getattr_after_rename_of_parent(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.mkdir(path="/my/path1")
+        self.mongo_operations.create(path="/my/path1/file")
+        self.mongo_operations.getattr(path="/my/path1/file")
+
+        self.mongo_operations.rename(old="/my", new="/our")
+
+        with self.assertRaises(fuse.FuseOSError):
+            self.mongo_operations.getattr(path="/my/path1/file")
+        self.assertTrue(stat.S_ISREG(self.mongo_operations.getattr(path="/our/path1/file")["st_mode"]))
+
+    def test_getattr_after_rename_over_file(self):
+        self.mongo_operations.create(path="/my_file")
+        self.mongo_operations.write(path="/my_file", buf=b"new content")
+        self.mongo_operations.create(path="/my_target_file")
+        self.mongo_operations.getattr(path="/my_file")
+        self.mongo_operations.getattr(path="/my_target_file")
+
+        self.mongo_operations.rename(old="/my_file", new="/my_target_file")
+
+        with self.assertRaises(fuse.FuseOSError):
+            self.mongo_operations.getattr(path="/my_file")
+        self.assertEqual(11, self.mongo_operations.getattr(path="/my_target_file")["st_size"])
+
+    def test_getattr_non_existent_file(self):
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.getattr(path="/this/file/does/not/exists")
+        self.assertEqual("[Errno 2] No such file or directory", str(context.exception))
+
     def test_mkdir(self):
         res = self.mongo_operations.mkdir(path="/my")
         self.assertEqual(0, res)
 
+    def test_mkdir_existing_path(self):
+        self.mongo_operations.mkdir(path="/my")
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.mkdir(path="/my")
+        self.assertEqual("[Errno 17] File exists", str(context.exception))
+        self.assertEqual(1, self.mongo_operations.inodes.count_documents({"path": "/my"}))
+
+    def test_mkdir_and_create_duplicate_key(self):
+        with mock.patch.object(self.mongo_operations.inodes, "insert_one",
+                               side_effect=DuplicateKeyError("duplicate key error")):
+            with self.assertRaises(fuse.FuseOSError) as mkdir_context:
+                self.mongo_operations.mkdir(path="/my")
+            with self.assertRaises(fuse.FuseOSError) as create_context:
+                self.mongo_operations.create(path="/my_file")
+        self.assertEqual("[Errno 17] File exists", str(mkdir_context.exception))
+        self.assertEqual("[Errno 17] File exists", str(create_context.exception))
+
     def test_mkdir_non_existent_path(self):
         with self.assertRaises(fuse.FuseOSError) as context:
             self.mongo_operations.mkdir(path="/my/path/for/mkdir")
@@ -47,6 +192,99 @@ class TestMongoOperations(unittest.TestCase):
         self.assertListEqual([".", "..", "path2"], files_after_rmdir)
         self.assertEqual(0, res_rmdir)
 
+    def test_rmdir_subtree(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.mkdir(path="/my/path1")
+        self.mongo_operations.mkdir(path="/my/path1/subpath")
+        self.mongo_operations.create(path="/my/path1/subpath/file")
+        self.mongo_operations.mkdir(path="/my/path10")
+
+        self.mongo_operations.rmdir(path="/my/path1")
+
+        self.assertListEqual([".", "..", "path10"], list(self.mongo_operations.readdir(path="/my")))
+        with self.assertRaises(fuse.FuseOSError):
+            self.mongo_operations.getattr(path="/my/path1/subpath/file")
+
+    def test_rmdir_special_characters(self):
+        self.mongo_operations.mkdir(path="/my.dir")
+        self.mongo_operations.mkdir(path="/my.dir/subpath")
+        self.mongo_operations.mkdir(path="/myxdir")
+        self.mongo_operations.mkdir(path="/myxdir/subpath")
+
+        self.mongo_operations.rmdir(path="/my.dir")
+
+        self.assertListEqual([".", "..", "myxdir"], list(self.mongo_operations.readdir(path="/")))
+        self.assertListEqual([".", "..", "subpath"], list(self.mongo_operations.readdir(path="/myxdir")))
+
+    def test_readdir(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.mkdir(path="/my/path1")
+        self.mongo_operations.mkdir(path="/my/path1/subpath")
+        self.mongo_operations.create(path="/my/file")
+        self.mongo_operations.create(path="/my_file")
+
+        root_files = list(self.mongo_operations.readdir(path="/"))
+        my_files = list(self.mongo_operations.readdir(path="/my"))
+
+        self.assertListEqual([".", "..", "my", "my_file"], root_files)
+        self.assertListEqual([".", "..", "file", "path1"], my_files)
+
+    def test_readdir_special_characters(self):
+        self.mongo_operations.mkdir(path="/my.dir+")
+        self.mongo_operations.mkdir(path="/my.dir+/[sub] (path)")
+        self.mongo_operations.create(path="/my.dir+/[sub] (path)/file*?")
+
+        my_files = list(self.mongo_operations.readdir(path="/my.dir+"))
+        sub_files = list(self.mongo_operations.readdir(path="/my.dir+/[sub] (path)"))
+
+        self.assertListEqual([".", "..", "[sub] (path)"], my_files)
+        self.assertListEqual([".", "..", "file*?"], sub_files)
+
+    def test_readdir_on_server(self):
+        now = time.time()
+        server_inodes = self.__server_collection(self.mongo_operations.inodes)
+        server_inodes.find.return_value.sort.side_effect = [
+            [{"path": "/my", "type": "dir", "last_updated_at": now}],
+            [{"path": "/my/file", "type": "file", "size": 0, "last_updated_at": now}],
+        ]
+
+        with mock.patch.object(self.mongo_operations, "inodes", server_inodes):
+            root_files = list(self.mongo_operations.readdir(path="/"))
+            my_files = list(self.mongo_operations.readdir(path="/my"))
+            file_stat = self.mongo_operations.getattr(path="/my/file")
+
+        self.assertListEqual([".", "..", "my"], root_files)
+        self.assertListEqual([".", "..", "file"], my_files)
+        self.assertTrue(stat.S_ISREG(file_stat["st_mode"]))
+        projection = {"type": 1, "size": 1, "last_updated_at": 1, "path": 1}
+        self.assertListEqual([
+            mock.call({"path": {"$gt": "/", "$lt": "0"},
+                       "$expr": {"$not": {"$regexMatch": {
+                           "input": {"$substrCP": ["$path", 1, {"$strLenCP": "$path"}]}, "regex": "/"
+                       }}}}, projection=projection),
+            mock.call({"path": {"$gt": "/my/", "$lt": "/my0"},
+                       "$expr": {"$not": {"$regexMatch": {
+                           "input": {"$substrCP": ["$path", 4, {"$strLenCP": "$path"}]}, "regex": "/"
+                       }}}}, projection=projection),
+        ], server_inodes.find.call_args_list)
+        server_inodes.find_one.assert_not_called()
+
+    def test_getattr_after_readdir(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.create(path="/my/file")
+        self.mongo_operations.write(path="/my/file", buf=b"this is the content")
+
+        list(self.mongo_operations.readdir(path="/my"))
+        file_stat = self.mongo_operations.getattr(path="/my/file")
+
+        self.assertTrue(stat.S_ISREG(file_stat["st_mode"]))
+        self.assertEqual(19, file_stat["st_size"])
+
+    def test_open(self):
+        self.mongo_operations.create(path="/my_file")
+        res = self.mongo_operations.open(path="/my_file")
+        self.assertEqual(0, res)
+
     def test_open_non_existent_file(self):
         path = "/my_file"
         with self.assertRaises(fuse.FuseOSError) as context:
@@ -58,6 +296,12 @@ class TestMongoOperations(unittest.TestCase):
         content = self.mongo_operations.read(path="/my_file", length=256)
         self.assertEqual(b"", content)
 
+    def test_create_existing_path(self):
+        self.mongo_operations.create(path="/my_file")
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.create(path="/my_file")
+        self.assertEqual("[Errno 17] File exists", str(context.exception))
+
     def test_create_non_existent_path(self):
         with self.assertRaises(fuse.FuseOSError) as context:
             self.mongo_operations.create(path="/this/path/does/not/exist")
@@ -74,11 +318,247 @@ class TestMongoOperations(unittest.TestCase):
         self.assertEqual(24, res_write)
         self.assertEqual(binary_text, actual_text)
 
+    def test_write_file_with_offset(self):
+        path = "/my_file"
+
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.write(path=path, buf=b"this is some binary text")
+        res_write = self.mongo_operations.write(path=path, buf=b"BINARY", offset=13)
+        actual_text = self.mongo_operations.read(path=path, length=512)
+        actual_partial_text = self.mongo_operations.read(path=path, length=5, offset=8)
+
+        self.assertEqual(6, res_write)
+        self.assertEqual(b"this is some BINARY text", actual_text)
+        self.assertEqual(b"some ", actual_partial_text)
+        self.assertEqual(24, self.mongo_operations.getattr(path=path)["st_size"])
+
+    def test_write_file_across_chunks(self):
+        path = "/my_file"
+        chunk_size = MongoOperations.CHUNK_SIZE
+        binary_text = bytes(range(256)) * (3 * chunk_size // 256) + b"tail"
+
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.write(path=path, buf=binary_text)
+        self.mongo_operations.write(path=path, buf=b"boundary", offset=chunk_size - 4)
+        actual_text = self.mongo_operations.read(path=path, length=len(binary_text) + 512)
+        expected_text = binary_text[:chunk_size - 4] + b"boundary" + binary_text[chunk_size + 4:]
+
+        self.assertEqual(expected_text, actual_text)
+        self.assertEqual(b"boundary", self.mongo_operations.read(path=path, length=8, offset=chunk_size - 4))
+
+    def test_write_file_appending(self):
+        path = "/my_file"
+        chunk_size = MongoOperations.CHUNK_SIZE
+        bufs = [b"a" * (chunk_size - 3), b"b" * 3, b"c" * chunk_size, b"d" * 7, b"e" * (2 * chunk_size)]
+
+        self.mongo_operations.create(path=path)
+        offset = 0
+        for buf in bufs:
+            self.mongo_operations.write(path=path, buf=buf, offset=offset)
+            offset += len(buf)
+        actual_text = self.mongo_operations.read(path=path, length=offset + 512)
+
+        self.assertEqual(b"".join(bufs), actual_text)
+        self.assertEqual(offset, self.mongo_operations.getattr(path=path)["st_size"])
+
+    def __write_fetched_chunk_idxs(self, path, buf, offset):
+        blobs = self.mongo_operations.blobs
+        with mock.patch.object(blobs, "find", wraps=blobs.find) as blobs_find:
+            self.mongo_operations.write(path=path, buf=buf, offset=offset)
+        return [sorted(call_args[0][0]["chunk_idx"]["$in"]) for call_args in blobs_find.call_args_list]
+
+    def test_write_file_fetches_only_partially_kept_chunks(self):
+        path = "/my_file"
+        chunk_size = MongoOperations.CHUNK_SIZE
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.write(path=path, buf=b"a" * (10 * chunk_size))
+
+        aligned_overwrite_fetches = self.__write_fetched_chunk_idxs(path=path, buf=b"b" * (3 * chunk_size),
+                                                                    offset=2 * chunk_size)
+        unaligned_overwrite_fetches = self.__write_fetched_chunk_idxs(path=path, buf=b"c" * (3 * chunk_size),
+                                                                      offset=2 * chunk_size + 1)
+        aligned_append_fetches = self.__write_fetched_chunk_idxs(path=path, buf=b"d" * (2 * chunk_size),
+                                                                 offset=10 * chunk_size)
+        unaligned_append_fetches = self.__write_fetched_chunk_idxs(path=path, buf=b"e" * 10,
+                                                                   offset=12 * chunk_size)
+        unaligned_append_tail_fetches = self.__write_fetched_chunk_idxs(path=path, buf=b"f" * chunk_size,
+                                                                        offset=12 * chunk_size + 10)
+
+        self.assertListEqual([], aligned_overwrite_fetches)
+        self.assertListEqual([[2, 5]], unaligned_overwrite_fetches)
+        self.assertListEqual([], aligned_append_fetches)
+        self.assertListEqual([], unaligned_append_fetches)
+        self.assertListEqual([[12]], unaligned_append_tail_fetches)
+        expected_text = (b"a" * (2 * chunk_size) + b"b" + b"c" * (3 * chunk_size) + b"a" * (5 * chunk_size - 1) +
+                         b"d" * (2 * chunk_size) + b"e" * 10 + b"f" * chunk_size)
+        self.assertEqual(expected_text, self.mongo_operations.read(path=path, length=len(expected_text) + 512))
+
+    def test_write_file_on_server(self):
+        path = "/my_file"
+        chunk_size = MongoOperations.CHUNK_SIZE
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.write(path=path, buf=b"a" * (2 * chunk_size))
+        inode_id = self.mongo_operations.inodes.find_one({"path": path})["_id"]
+        server_blobs = self.__server_collection(self.mongo_operations.blobs)
+        server_blobs.find.side_effect = self.mongo_operations.blobs.find
+
+        with mock.patch.object(self.mongo_operations, "blobs", server_blobs):
+            written_bytes = self.mongo_operations.write(path=path, buf=b"xy", offset=chunk_size - 1)
+
+        self.assertEqual(2, written_bytes)
+        server_blobs.bulk_write.assert_called_once_with([
+            pymongo.UpdateOne({"inode_id": inode_id, "chunk_idx": 0},
+                              {"$set": {"data": b"a" * (chunk_size - 1) + b"x"}}, upsert=True),
+            pymongo.UpdateOne({"inode_id": inode_id, "chunk_idx": 1},
+                              {"$set": {"data": b"y" + b"a" * (chunk_size - 1)}}, upsert=True),
+        ], ordered=False)
+        server_blobs.update_one.assert_not_called()
+
+    def test_write_file_beyond_end(self):
+        path = "/my_file"
+        offset = 2 * MongoOperations.CHUNK_SIZE + 10
+
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.write(path=path, buf=b"head")
+        self.mongo_operations.write(path=path, buf=b"tail", offset=offset)
+        actual_text = self.mongo_operations.read(path=path, length=offset + 512)
+
+        self.assertEqual(b"head" + b"\x00" * (offset - 4) + b"tail", actual_text)
+
     def test_write_non_existent_file(self):
         with self.assertRaises(fuse.FuseOSError) as context:
             self.mongo_operations.write(path="/non_existent_file", buf=b"this is some binary text")
         self.assertEqual("[Errno 5] Input/output error", str(context.exception))
 
+    def test_unlink(self):
+        path = "/my_file"
+        self.mongo_operations.create(path=path)
+        self.mongo_operations.write(path=path, buf=b"this is some binary text")
+
+        res_unlink = self.mongo_operations.unlink(path=path)
+
+        self.assertEqual(0, res_unlink)
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.read(path=path, length=512)
+        self.assertEqual("[Errno 5] Input/output error", str(context.exception))
+
+    def test_unlink_dir(self):
+        self.mongo_operations.mkdir(path="/my")
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.unlink(path="/my")
+        self.assertEqual("[Errno 21] Is a directory", str(context.exception))
+
+    def test_rename(self):
+        self.mongo_operations.create(path="/my_file")
+        self.mongo_operations.write(path="/my_file", buf=b"this is some binary text")
+
+        res_rename = self.mongo_operations.rename(old="/my_file", new="/my_renamed_file")
+
+        self.assertEqual(0, res_rename)
+        self.assertListEqual([".", "..", "my_renamed_file"], list(self.mongo_operations.readdir(path="/")))
+        self.assertEqual(b"this is some binary text", self.mongo_operations.read(path="/my_renamed_file", length=512))
+
+    def test_rename_dir(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.mkdir(path="/my/path1")
+        self.mongo_operations.create(path="/my/path1/file")
+        self.mongo_operations.write(path="/my/path1/file", buf=b"this is some binary text")
+        self.mongo_operations.mkdir(path="/my_sibling")
+
+        self.mongo_operations.rename(old="/my", new="/our")
+
+        self.assertListEqual([".", "..", "my_sibling", "our"], list(self.mongo_operations.readdir(path="/")))
+        self.assertListEqual([".", "..", "path1"], list(self.mongo_operations.readdir(path="/our")))
+        self.assertEqual(b"this is some binary text", self.mongo_operations.read(path="/our/path1/file", length=512))
+        with self.assertRaises(fuse.FuseOSError):
+            self.mongo_operations.getattr(path="/my/path1/file")
+
+    def test_rename_dir_special_characters(self):
+        self.mongo_operations.mkdir(path="/my.dir")
+        self.mongo_operations.mkdir(path="/my.dir/subpath")
+        self.mongo_operations.mkdir(path="/myxdir")
+        self.mongo_operations.mkdir(path="/myxdir/subpath")
+
+        self.mongo_operations.rename(old="/my.dir", new="/our.dir")
+
+        self.assertListEqual([".", "..", "myxdir", "our.dir"], list(self.mongo_operations.readdir(path="/")))
+        self.assertListEqual([".", "..", "subpath"], list(self.mongo_operations.readdir(path="/myxdir")))
+        self.assertListEqual([".", "..", "subpath"], list(self.mongo_operations.readdir(path="/our.dir")))
+
+    def test_rename_over_existing_file(self):
+        self.mongo_operations.create(path="/my_file")
+        self.mongo_operations.write(path="/my_file", buf=b"new content")
+        self.mongo_operations.create(path="/my_target_file")
+        self.mongo_operations.write(path="/my_target_file", buf=b"old content that is longer")
+
+        self.mongo_operations.rename(old="/my_file", new="/my_target_file")
+
+        self.assertListEqual([".", "..", "my_target_file"], list(self.mongo_operations.readdir(path="/")))
+        self.assertEqual(1, self.mongo_operations.inodes.count_documents({"path": "/my_target_file"}))
+        self.assertEqual(b"new content", self.mongo_operations.read(path="/my_target_file", length=512))
+
+    def test_rename_dir_over_empty_dir(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.create(path="/my/file")
+        self.mongo_operations.mkdir(path="/our")
+
+        self.mongo_operations.rename(old="/my", new="/our")
+
+        self.assertListEqual([".", "..", "our"], list(self.mongo_operations.readdir(path="/")))
+        self.assertListEqual([".", "..", "file"], list(self.mongo_operations.readdir(path="/our")))
+        self.assertEqual(1, self.mongo_operations.inodes.count_documents({"path": "/our"}))
+
+    def test_rename_dir_over_non_empty_dir(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.mkdir(path="/our")
+        self.mongo_operations.create(path="/our/file")
+
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.rename(old="/my", new="/our")
+
+        self.assertEqual("[Errno 39] Directory not empty", str(context.exception))
+        self.assertListEqual([".", "..", "my", "our"], list(self.mongo_operations.readdir(path="/")))
+
+    def test_rename_between_file_and_dir(self):
+        self.mongo_operations.mkdir(path="/my")
+        self.mongo_operations.create(path="/my_file")
+
+        with self.assertRaises(fuse.FuseOSError) as file_over_dir_context:
+            self.mongo_operations.rename(old="/my_file", new="/my")
+        with self.assertRaises(fuse.FuseOSError) as dir_over_file_context:
+            self.mongo_operations.rename(old="/my", new="/my_file")
+
+        self.assertEqual("[Errno 21] Is a directory", str(file_over_dir_context.exception))
+        self.assertEqual("[Errno 20] Not a directory", str(dir_over_file_context.exception))
+
+    def test_rename_non_existent_file(self):
+        with self.assertRaises(fuse.FuseOSError) as context:
+            self.mongo_operations.rename(old="/non_existent_file", new="/my_file")
+        self.assertEqual("[Errno 2] No such file or directory", str(context.exception))
+
+    @staticmethod
+    def __server_collection(col):
+        # MontyDB lacks the server-only features, so a mocked pymongo collection records what would be sent
+        server_col = mock.create_autospec(Collection, instance=True)
+        server_col.find_one.side_effect = col.find_one
+        return server_col
+
+    def test_rename_dir_on_server(self):
+        self.mongo_operations.mkdir(path="/my.dir")
+        server_inodes = self.__server_collection(self.mongo_operations.inodes)
+
+        with mock.patch.object(self.mongo_operations, "inodes", server_inodes), \
+                mock.patch.object(time, "time", return_value=1234.5):
+            res_rename = self.mongo_operations.rename(old="/my.dir", new="/our.dir")
+
+        self.assertEqual(0, res_rename)
+        server_inodes.update_many.assert_called_once_with(
+            {"$or": [{"path": "/my.dir"}, {"path": {"$gt": "/my.dir/", "$lt": "/my.dir0"}}]},
+            [{"$set": {"path": {"$concat": ["/our.dir", {"$substrCP": ["$path", 7, {"$strLenCP": "$path"}]}]},
+                       "last_updated_at": 1234.5}}]
+        )
+        server_inodes.update_one.assert_not_called()
+
     def test_truncate(self):
         path = "/my_file"
         binary_text = b"this is some binary text"